@@ -0,0 +1,138 @@
+import pandas as pd
+
+# Aggregates behind the dashboard's charts.
+#
+# Kept out of the Streamlit script so the warm-up worker can precompute them
+# for the default view and persist the results. Both functions expect the
+# dashboard's preprocessed frame (with `hours` and `date` columns).
+
+TIME_BUCKETS = ['Morning (5-11)', 'Afternoon (12-17)', 'Evening (18-22)', 'Night (23-4)']
+MONTH_ORDER = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+WEEKDAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def time_bucket(h):
+    if 5 <= h <= 11:
+        return 'Morning (5-11)'
+    elif 12 <= h <= 17:
+        return 'Afternoon (12-17)'
+    elif 18 <= h <= 22:
+        return 'Evening (18-22)'
+    else:
+        return 'Night (23-4)'
+
+
+def format_hours(h):
+    return f"{int(h)} hrs {int(round((h - int(h)) * 60))} mins"
+
+
+def top_tracks(df, top_n):
+    if 'track_id' in df.columns:
+        tracks = (df.groupby(['master_metadata_track_name', 'track_id'])['hours']
+                  .sum()
+                  .sort_values(ascending=False)
+                  .head(top_n)
+                  .reset_index())
+        tracks.columns = ['Track', 'Track ID', 'Hours']
+    else:
+        tracks = (df.groupby('master_metadata_track_name')['hours']
+                  .sum()
+                  .sort_values(ascending=False)
+                  .head(top_n)
+                  .reset_index())
+        tracks.columns = ['Track', 'Hours']
+    tracks['Listening Time'] = tracks['Hours'].apply(format_hours)
+    return tracks
+
+
+def flag_counts(df, col, labels, name):
+    counts = df[col].value_counts().rename(index=labels).reset_index()
+    counts.columns = [name, 'Count']
+    return counts
+
+
+def hours_by(df, col, name):
+    hours = df.groupby(col)['hours'].sum().round(2).reset_index()
+    hours.columns = [name, 'Hours']
+    return hours
+
+
+def time_of_day(df):
+    # 24-entry lookup instead of calling time_bucket once per play
+    hour = pd.to_datetime(df['ts_local_clean']).dt.hour
+    buckets = hour.map({h: time_bucket(h) for h in range(24)})
+    return df['hours'].groupby(buckets).sum().rename_axis('time_bucket').reindex(TIME_BUCKETS).reset_index()
+
+
+def overview(df, top_n=10):
+    ts = pd.to_datetime(df['ts_local_clean'])
+    played = df[df['ms_played'] > 0]
+    view = {
+        'total_hours': df['hours'].sum(),
+        'total_tracks': len(played),
+        'unique_days': df['date'].nunique(),
+        'top_tracks': top_tracks(played, top_n),
+        'shuffle_counts': flag_counts(df, 'shuffle', {True: "Shuffled", False: "Not Shuffled"}, 'Shuffle'),
+        'offline_counts': flag_counts(df, 'offline', {True: "Offline", False: "Online"}, 'Mode'),
+        'country_counts': hours_by(df, 'conn_country_full', 'Country'),
+        'time_series': df.groupby('date')['hours'].sum().round(2).reset_index(),
+        'time_of_day': time_of_day(df),
+    }
+
+    platform_usage = df.groupby('platform_clean')['hours'].sum().sort_values(ascending=False).reset_index()
+    platform_usage.columns = ['Platform', 'Hours']
+    platform_usage['Hours'] = platform_usage['Hours'].round(2)
+    view['platform_usage'] = platform_usage
+
+    # Skips and replays
+    if 'skipped' in df.columns:
+        view['total_skipped'] = df['skipped'].sum()
+        view['top_skipped'] = (df[df['skipped'] == True]
+                               .groupby('master_metadata_track_name')
+                               .size()
+                               .sort_values(ascending=False)
+                               .head(5)
+                               .reset_index(name='Skips'))
+        view['top_played'] = (df[df['skipped'] == False]
+                              .groupby('master_metadata_track_name')['hours']
+                              .sum()
+                              .sort_values(ascending=False)
+                              .head(5)
+                              .reset_index())
+    else:
+        view['total_skipped'] = 0
+        view['top_skipped'] = pd.DataFrame()
+        view['top_played'] = pd.DataFrame()
+
+    # Monthly and weekday trends
+    month = ts.dt.strftime('%b')
+    monthly = df['hours'].groupby([ts.dt.month.rename('month_num'), month.rename('month')]).sum()
+    view['monthly_hours'] = monthly.reset_index().sort_values('month_num')
+
+    # Average daily listening hours by weekday (use daily totals)
+    daily_totals = df.groupby('date')['hours'].sum().reset_index()
+    daily_totals['weekday'] = pd.to_datetime(daily_totals['date']).dt.day_name()
+    view['weekday_hours'] = daily_totals.groupby('weekday')['hours'].mean().reindex(WEEKDAY_ORDER).reset_index()
+
+    # Categorical keys preserve calendar order in the heatmap
+    month = pd.Categorical(month, categories=MONTH_ORDER, ordered=True)
+    weekday = pd.Categorical(ts.dt.day_name(), categories=WEEKDAY_ORDER, ordered=True)
+    heatmap = df['hours'].groupby([month, weekday], observed=False).sum().unstack(fill_value=0)
+    heatmap.index.name, heatmap.columns.name = 'month', 'weekday'
+    view['heatmap_data'] = heatmap.loc[MONTH_ORDER]
+    return view
+
+
+def artist_overview(artist_df, top_n=10):
+    return {
+        'hours': artist_df['hours'].sum().round(2),
+        'tracks': len(artist_df['master_metadata_track_name'].unique()),
+        'top_tracks': top_tracks(artist_df, top_n),
+        'time_of_day': time_of_day(artist_df),
+        'time_series': artist_df.groupby('date')['hours'].sum().round(2).reset_index(),
+        'platform_usage': hours_by(artist_df, 'platform_clean', 'Platform'),
+        'shuffle_counts': flag_counts(artist_df, 'shuffle', {True: "Shuffled", False: "Not Shuffled"}, 'Shuffle'),
+        'offline_counts': flag_counts(artist_df, 'offline', {True: "Offline", False: "Online"}, 'Mode'),
+        'country_counts': hours_by(artist_df, 'conn_country_full', 'Country'),
+    }
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Country enrichment for the raw streaming history.
+#
+# Corrects VPN-skewed `conn_country` codes using the rules in
+# country_corrections.json and adds `conn_country_full`. Both steps work on the
+# categorical codes of `conn_country`, so each lookup runs once per distinct
+# country instead of once per play. The alpha-2 -> name table is built from
+# pycountry once and cached in COUNTRY_NAMES_CACHE, so later runs never import
+# or iterate pycountry.
+#
+# Rules look like {"from": "SG", "to": "IN"}; an optional "start" (inclusive)
+# and/or "end" (exclusive) ISO date limits a rule to plays in that window,
+# compared against the UTC `ts` column.
+
+CORRECTIONS_FILE = "country_corrections.json"
+COUNTRY_NAMES_CACHE = "country_names.json"
+
+
+def load_corrections(path=CORRECTIONS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['rules']
+
+
+def load_country_names(cache_path=COUNTRY_NAMES_CACHE):
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    import pycountry
+    names = {country.alpha_2: country.name for country in pycountry.countries}
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(names, f, indent=1, ensure_ascii=False)
+    return names
+
+
+def correct_countries(countries, rules, ts=None):
+    countries = countries.astype('category')
+    old_categories = list(countries.cat.categories)
+    old_codes = countries.cat.codes.to_numpy()
+    static = {r['from']: r['to'] for r in rules if 'start' not in r and 'end' not in r}
+    dated = [r for r in rules if 'start' in r or 'end' in r]
+
+    categories = sorted({static.get(c, c) for c in old_categories} | {r['to'] for r in dated})
+    index = {c: i for i, c in enumerate(categories)}
+    # One lookup per distinct country; the trailing -1 keeps missing values
+    # (code -1) missing.
+    lookup = np.array([index[static.get(c, c)] for c in old_categories] + [-1])
+    codes = lookup[old_codes]
+
+    # Date-dependent rules match the original code and override static rules
+    # for plays inside their window.
+    if dated:
+        if ts is None:
+            raise ValueError("Date-dependent country corrections need the 'ts' column")
+        ts = pd.to_datetime(ts, utc=True)
+        for rule in dated:
+            if rule['from'] not in old_categories:
+                continue
+            mask = old_codes == old_categories.index(rule['from'])
+            if 'start' in rule:
+                mask &= (ts >= pd.Timestamp(rule['start'], tz='UTC')).to_numpy()
+            if 'end' in rule:
+                mask &= (ts < pd.Timestamp(rule['end'], tz='UTC')).to_numpy()
+            codes[mask] = index[rule['to']]
+
+    corrected = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.Series(corrected, index=countries.index, name=countries.name).cat.remove_unused_categories()
+
+
+def enrich_countries(df, corrections_path=CORRECTIONS_FILE, cache_path=COUNTRY_NAMES_CACHE):
+    df = df.copy()
+    rules = load_corrections(corrections_path)
+    df['conn_country'] = correct_countries(df['conn_country'], rules, df.get('ts'))
+    names = load_country_names(cache_path)
+    # Categorical map: one lookup per distinct country code
+    df['conn_country_full'] = df['conn_country'].map(names).astype(object)
+    return df
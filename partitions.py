@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Year/month partitioned store of the cleaned listening history.
+#
+# df_clean.csv is split into STORE_DIR/year=YYYY/month=MM/part.pkl and a
+# manifest records per-partition statistics: min/max timestamp, the distinct
+# platforms and countries, min/max of the boolean flags and a content hash
+# (so caches built from a partition can tell when its rows change). A filter is first
+# checked against the manifest, so only partitions that can contain matching
+# rows are read; the row-level mask then runs on that subset alone.
+#
+# Partitions are pickled DataFrames so dtypes survive the round trip without
+# adding a parquet engine to the dependencies.
+#
+# Usage:
+#   python partitions.py [df_clean.csv]
+
+STORE_DIR = "store"
+MANIFEST_FILE = "manifest.json"
+SET_COLUMNS = {'platforms': 'platform_clean', 'countries': 'conn_country_full'}
+FLAG_COLUMNS = {'shuffle': 'shuffle', 'offline': 'offline', 'incognito': 'incognito_mode'}
+
+
+def empty_filters():
+    # None means "don't filter on this"
+    return {
+        'years': None,
+        'start': None,
+        'end': None,
+        'platforms': None,
+        'countries': None,
+        'shuffle': None,
+        'offline': None,
+        'incognito': None,
+    }
+
+
+def _partition_stats(part, rel_path):
+    ts = part['ts_local_clean']
+    stats = {
+        'path': rel_path,
+        'year': int(ts.dt.year.iloc[0]),
+        'month': int(ts.dt.month.iloc[0]),
+        'rows': int(len(part)),
+        'hash': hashlib.sha1(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes()).hexdigest(),
+        'ts_min': str(ts.min()),
+        'ts_max': str(ts.max()),
+    }
+    for name, col in SET_COLUMNS.items():
+        if col in part.columns:
+            stats[name] = sorted(str(v) for v in part[col].dropna().unique())
+    for name, col in FLAG_COLUMNS.items():
+        if col in part.columns:
+            values = part[col].dropna().astype(bool)
+            stats[name] = [bool(values.min()), bool(values.max())] if not values.empty else []
+    return stats
+
+
+def build_store(df, path=STORE_DIR):
+    df = df.copy()
+    df['ts_local_clean'] = pd.to_datetime(df['ts_local_clean'])
+    df = df.dropna(subset=['ts_local_clean']).sort_values('ts_local_clean')
+    partitions = []
+    for (year, month), part in df.groupby([df['ts_local_clean'].dt.year, df['ts_local_clean'].dt.month]):
+        rel_path = os.path.join(f"year={year}", f"month={month:02d}", "part.pkl")
+        os.makedirs(os.path.join(path, os.path.dirname(rel_path)), exist_ok=True)
+        part.to_pickle(os.path.join(path, rel_path))
+        partitions.append(_partition_stats(part, rel_path))
+    manifest = {'partitions': partitions}
+    with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(path=STORE_DIR):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ensure_store(csv_path="df_clean.csv", path=STORE_DIR):
+    # Rebuild whenever the source CSV is newer than the manifest, or the
+    # manifest predates per-partition content hashes
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path) and os.path.getmtime(manifest_path) >= os.path.getmtime(csv_path):
+        manifest = load_manifest(path)
+        if all('hash' in p for p in manifest['partitions']):
+            return manifest
+    df = pd.read_csv(csv_path, parse_dates=["ts_local_clean"])
+    return build_store(df, path)
+
+
+def partition_values(manifest, name):
+    # Distinct values of a SET_COLUMNS entry (or 'year') across the store,
+    # read from the manifest only.
+    values = set()
+    for p in manifest['partitions']:
+        if name == 'year':
+            values.add(p['year'])
+        else:
+            values.update(p.get(name, []))
+    return sorted(values)
+
+
+def _may_match(stats, filters):
+    if filters['years'] is not None and stats['year'] not in filters['years']:
+        return False
+    if filters['start'] is not None and pd.Timestamp(stats['ts_max']) < pd.Timestamp(filters['start']):
+        return False
+    if filters['end'] is not None and pd.Timestamp(stats['ts_min']) >= pd.Timestamp(filters['end']) + pd.Timedelta(days=1):
+        return False
+    for name in SET_COLUMNS:
+        if filters[name] is not None and name in stats and not set(filters[name]) & set(stats[name]):
+            return False
+    for name in FLAG_COLUMNS:
+        if filters[name] is not None and name in stats:
+            if not stats[name] or not stats[name][0] <= filters[name] <= stats[name][1]:
+                return False
+    return True
+
+
+def prune(manifest, filters):
+    return [p for p in manifest['partitions'] if _may_match(p, filters)]
+
+
+def read_partition(rel_path, path=STORE_DIR):
+    return pd.read_pickle(os.path.join(path, rel_path))
+
+
+def apply_filters(df, filters):
+    mask = pd.Series(True, index=df.index)
+    if filters['years'] is not None:
+        mask &= df['ts_local_clean'].dt.year.isin(filters['years'])
+    if filters['start'] is not None:
+        mask &= df['ts_local_clean'] >= pd.Timestamp(filters['start'])
+    if filters['end'] is not None:
+        mask &= df['ts_local_clean'] < pd.Timestamp(filters['end']) + pd.Timedelta(days=1)
+    for name, col in SET_COLUMNS.items():
+        if filters[name] is not None and col in df.columns:
+            mask &= df[col].astype(str).isin(filters[name])
+    for name, col in FLAG_COLUMNS.items():
+        if filters[name] is not None and col in df.columns:
+            mask &= df[col] == filters[name]
+    return df[mask]
+
+
+def read(filters, manifest=None, path=STORE_DIR, reader=None):
+    # reader(stats) -> DataFrame can be swapped for a cached reader by the caller
+    manifest = manifest or load_manifest(path)
+    reader = reader or (lambda stats: read_partition(stats['path'], path))
+    parts = [apply_filters(reader(p), filters) for p in prune(manifest, filters)]
+    if not parts:
+        if not manifest['partitions']:
+            return pd.DataFrame()
+        return reader(manifest['partitions'][0]).iloc[0:0]
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "df_clean.csv"
+    df = pd.read_csv(csv_path, parse_dates=["ts_local_clean"])
+    manifest = build_store(df)
+    print(f"Wrote {len(manifest['partitions'])} partitions ({len(df):,} rows) to {STORE_DIR}/")
@@ -0,0 +1,249 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import partitions
+
+# Incremental rollups for the dashboard.
+#
+# Instead of re-aggregating the full listening history on every export, the
+# daily/track/artist/country totals are persisted to ROLLUP_DIR and new plays
+# (anything newer than the last persisted timestamp) are applied as deltas.
+# Streak and milestone state is carried forward from the last persisted day.
+#
+# Plays are read from the partitioned store (see partitions.py). The state
+# records the manifest hash of every partition it has seen, so a refresh only
+# reads the partitions whose hash changed since the last one: with unchanged
+# data it reads nothing, and a new export usually touches just the latest
+# month. A refresh therefore costs O(changed partitions) rather than
+# O(history).
+#
+# `ts_local_clean` is local time, so it does not increase monotonically across
+# time zones, and late-synced offline plays or edits to past rows (e.g. new VPN
+# corrections) can land behind the watermark. The state also keeps a row count
+# and content hash per month of the plays applied so far; the plays at or
+# before the watermark in each changed partition are checked against them, and
+# the rollups are rebuilt from scratch when they differ.
+#
+# Usage:
+#   python rollups.py [df_clean.csv] [--rebuild]
+
+ROLLUP_DIR = "rollups"
+STATE_FILE = "state.json"
+# Bump when the shape of the rollup tables or state changes
+ROLLUP_VERSION = 2
+MILESTONES = [100, 500, 1000, 2000, 5000, 10000, 20000]
+# Columns covered by the content hash used to detect rewritten history
+HASH_COLUMNS = ['ts_local_clean', 'ms_played', 'master_metadata_track_name', 'track_id',
+                'master_metadata_album_artist_name', 'conn_country_full']
+
+# Rollup table name -> grouping columns. Missing keys (e.g. no track_id for
+# local files) are kept as their own group so no hours are dropped; readers
+# filter them out where the live views would.
+ROLLUP_KEYS = {
+    'daily': ['date'],
+    'track': ['master_metadata_track_name', 'track_id'],
+    'artist': ['master_metadata_album_artist_name'],
+    'country': ['conn_country_full'],
+}
+
+
+def content_hash(df):
+    # Row hashes summed modulo 2**64: independent of row order, and the hash of
+    # the history extends by adding the hash of each delta.
+    cols = [c for c in HASH_COLUMNS if c in df.columns]
+    rows = df[cols].copy()
+    if 'ts_local_clean' in rows.columns:
+        rows['ts_local_clean'] = pd.to_datetime(rows['ts_local_clean']).astype('datetime64[ns]')
+    return int(pd.util.hash_pandas_object(rows, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+def empty_state():
+    return {
+        'version': ROLLUP_VERSION,
+        'last_ts': None,
+        'rows': 0,
+        # 'YYYY-MM' -> [rows, content hash] of the plays applied so far
+        'months': {},
+        # Store partition path -> manifest hash as of the last refresh
+        'partitions': {},
+        'total_hours': 0.0,
+        'first_play': None,
+        'last_day': None,
+        'current_streak': None,
+        'longest_streak': None,
+        'milestones': {},
+    }
+
+
+def load_rollups(path=ROLLUP_DIR):
+    tables = {}
+    for name in ROLLUP_KEYS:
+        table_path = os.path.join(path, f"{name}.csv")
+        if os.path.exists(table_path):
+            table = pd.read_csv(table_path)
+            if name == 'daily':
+                table['date'] = pd.to_datetime(table['date']).dt.date
+            tables[name] = table
+        else:
+            tables[name] = None
+    state_path = os.path.join(path, STATE_FILE)
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    else:
+        state = empty_state()
+    return tables, state
+
+
+def save_rollups(tables, state, path=ROLLUP_DIR):
+    os.makedirs(path, exist_ok=True)
+    for name, table in tables.items():
+        table_path = os.path.join(path, f"{name}.csv")
+        if table is not None:
+            table.to_csv(table_path, index=False)
+        elif os.path.exists(table_path):
+            # Left over from before a rebuild
+            os.remove(table_path)
+    # State is written last so a crash mid-save never advances the watermark
+    # past tables that were not written.
+    with open(os.path.join(path, STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def _prepare(df):
+    df = df.copy()
+    df['ts_local_clean'] = pd.to_datetime(df['ts_local_clean'])
+    df['hours'] = df['ms_played'] / (1000 * 60 * 60)
+    df['date'] = df['ts_local_clean'].dt.date
+    df['plays'] = (df['ms_played'] > 0).astype(int)
+    return df.sort_values('ts_local_clean')
+
+
+def _merge_table(table, delta, keys):
+    if table is None or table.empty:
+        return delta
+    merged = pd.concat([table, delta]).groupby(keys, as_index=False, dropna=False)[['hours', 'plays']].sum()
+    return merged
+
+
+def _update_streaks(state, new_days):
+    # new_days are sorted and never earlier than state['last_day'] because the
+    # watermark only admits plays newer than the last persisted timestamp.
+    last_day = pd.Timestamp(state['last_day']) if state['last_day'] else None
+    current = state['current_streak']
+    longest = state['longest_streak']
+    for day in new_days:
+        day = pd.Timestamp(day)
+        if last_day is not None and day <= last_day:
+            continue
+        if last_day is not None and day - last_day == pd.Timedelta(days=1):
+            current = {'start': current['start'], 'end': str(day.date()), 'count': current['count'] + 1}
+        else:
+            current = {'start': str(day.date()), 'end': str(day.date()), 'count': 1}
+        # Strict comparison keeps the earliest streak on ties, like the dashboard
+        if longest is None or current['count'] > longest['count']:
+            longest = dict(current)
+        last_day = day
+    state['current_streak'] = current
+    state['longest_streak'] = longest
+    if last_day is not None:
+        state['last_day'] = str(last_day.date())
+
+
+def _update_milestones(state, daily_delta):
+    cumulative = state['total_hours'] + daily_delta['hours'].cumsum()
+    for m in MILESTONES:
+        if str(m) in state['milestones']:
+            continue
+        crossed = daily_delta.loc[cumulative >= m, 'date']
+        if not crossed.empty:
+            state['milestones'][str(m)] = str(crossed.iloc[0])
+    state['total_hours'] = float(state['total_hours'] + daily_delta['hours'].sum())
+
+
+def apply_delta(tables, state, new_plays):
+    if new_plays.empty:
+        return tables, state
+    new_plays = _prepare(new_plays)
+
+    for name, keys in ROLLUP_KEYS.items():
+        keys = [k for k in keys if k in new_plays.columns]
+        delta = new_plays.groupby(keys, as_index=False, dropna=False)[['hours', 'plays']].sum()
+        tables[name] = _merge_table(tables[name], delta, keys)
+    tables['daily'] = tables['daily'].sort_values('date').reset_index(drop=True)
+
+    if state['first_play'] is None:
+        first_row = new_plays.iloc[0]
+        state['first_play'] = {
+            'track': first_row['master_metadata_track_name'],
+            'artist': first_row['master_metadata_album_artist_name'],
+            'date': str(first_row['date']),
+        }
+
+    daily_delta = new_plays.groupby('date', as_index=False)['hours'].sum().sort_values('date')
+    _update_streaks(state, daily_delta['date'])
+    _update_milestones(state, daily_delta)
+
+    state['rows'] += len(new_plays)
+    month = new_plays['ts_local_clean'].dt.strftime('%Y-%m')
+    for key, plays in new_plays.groupby(month):
+        rows, month_hash = state['months'].get(key, [0, 0])
+        state['months'][key] = [rows + len(plays), (month_hash + content_hash(plays)) % 2 ** 64]
+    state['last_ts'] = str(new_plays['ts_local_clean'].max())
+    return tables, state
+
+
+def _month_key(stats):
+    return f"{stats['year']}-{stats['month']:02d}"
+
+
+def new_plays_since(manifest, state, reader):
+    # Plays newer than the watermark, read from the partitions whose hash
+    # changed since the last refresh. None means history at or before the
+    # watermark changed and the rollups must be rebuilt.
+    seen = state['partitions']
+    if set(seen) - {p['path'] for p in manifest['partitions']}:
+        return None
+    watermark = pd.Timestamp(state['last_ts'])
+    new_plays = []
+    for stats in manifest['partitions']:
+        if seen.get(stats['path']) == stats['hash']:
+            continue
+        part = reader(stats)
+        ts = pd.to_datetime(part['ts_local_clean'])
+        history = part[ts <= watermark]
+        if [len(history), content_hash(history)] != state['months'].get(_month_key(stats), [0, 0]):
+            return None
+        new_plays.append(part[ts > watermark])
+    return pd.concat(new_plays, ignore_index=True) if new_plays else pd.DataFrame()
+
+
+def refresh(manifest, path=ROLLUP_DIR, rebuild=False, reader=None, store=partitions.STORE_DIR):
+    # reader(stats) -> DataFrame can be swapped for a cached reader by the caller
+    reader = reader or (lambda stats: partitions.read_partition(stats['path'], store))
+    tables, state = load_rollups(path)
+    new_plays = None
+    if not rebuild and state.get('version') == ROLLUP_VERSION and state['last_ts'] is not None:
+        new_plays = new_plays_since(manifest, state, reader)
+    if new_plays is None:
+        tables, state = {name: None for name in ROLLUP_KEYS}, empty_state()
+        new_plays = partitions.read(partitions.empty_filters(), manifest, store, reader)
+        rebuild = True
+    seen = {p['path']: p['hash'] for p in manifest['partitions']}
+    if rebuild or seen != state['partitions']:
+        tables, state = apply_delta(tables, state, new_plays)
+        state['partitions'] = seen
+        save_rollups(tables, state, path)
+    return tables, state
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    csv_path = args[0] if args else "df_clean.csv"
+    manifest = partitions.ensure_store(csv_path)
+    tables, state = refresh(manifest, rebuild="--rebuild" in sys.argv)
+    print(f"Rollups cover {state['rows']:,} plays (last play {state['last_ts']})")
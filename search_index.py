@@ -0,0 +1,108 @@
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+# Typeahead search over artists, tracks and albums for the sidebar.
+#
+# Built once from the listening history: every name is normalised (lowercase,
+# accents stripped) and indexed two ways:
+#   - a sorted list of (key, entry) pairs, where the keys are the full name and
+#     each of its words, so prefix lookups are a bisect over that list;
+#   - a trigram inverted index, so misspelled queries still find candidates.
+# Results are ranked by listening hours and capped at `limit`, so the widget
+# only ever receives a small payload regardless of library size.
+
+KINDS = ('artist', 'track', 'album')
+KIND_COLUMNS = {
+    'artist': 'master_metadata_album_artist_name',
+    'track': 'master_metadata_track_name',
+    'album': 'master_metadata_album_album_name',
+}
+MIN_FUZZY_SCORE = 0.3
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, entries):
+        # entries: list of dicts with kind, name, artist and hours, sorted by
+        # hours descending so entry ids double as the hours ranking.
+        self.entries = sorted(entries, key=lambda e: e['hours'], reverse=True)
+        keys = []
+        self.grams = defaultdict(list)
+        self.gram_counts = []
+        for i, entry in enumerate(self.entries):
+            name = normalize(entry['name'])
+            for key in {name, *name.split()}:
+                keys.append((key, i))
+            grams = trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.grams[gram].append(i)
+        keys.sort()
+        self.keys = keys
+        self.key_strings = [k for k, _ in keys]
+
+    @classmethod
+    def from_dataframe(cls, df):
+        hours = df['ms_played'] / (1000 * 60 * 60)
+        entries = []
+        artist_col = KIND_COLUMNS['artist']
+        for kind, col in KIND_COLUMNS.items():
+            if col not in df.columns:
+                continue
+            group_cols = [col] if kind == 'artist' else [col, artist_col]
+            totals = hours.groupby([df[c] for c in group_cols]).sum()
+            for key, h in totals.items():
+                name, artist = (key, key) if kind == 'artist' else key
+                entries.append({'kind': kind, 'name': name, 'artist': artist, 'hours': float(h)})
+        return cls(entries)
+
+    def _prefix_matches(self, query):
+        matches = set()
+        start = bisect_left(self.key_strings, query)
+        for key, i in self.keys[start:]:
+            if not key.startswith(query):
+                break
+            matches.add(i)
+        return matches
+
+    def _fuzzy_matches(self, query):
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.grams.get(gram, ()))
+        scores = {}
+        for i, count in shared.items():
+            # Dice coefficient over trigram sets
+            score = 2 * count / (len(query_grams) + self.gram_counts[i])
+            if score >= MIN_FUZZY_SCORE:
+                scores[i] = score
+        return scores
+
+    def search(self, query, kinds=KINDS, limit=20):
+        query = normalize(query)
+        if not query:
+            ranked = (i for i, e in enumerate(self.entries) if e['kind'] in kinds)
+            return [self.entries[i] for _, i in zip(range(limit), ranked)]
+
+        prefix = sorted(i for i in self._prefix_matches(query) if self.entries[i]['kind'] in kinds)
+        results = prefix[:limit]
+        if len(results) < limit:
+            # Typo tolerance: fill the remaining slots with trigram matches,
+            # best similarity first and hours (entry id) as the tie-break.
+            seen = set(results)
+            fuzzy = self._fuzzy_matches(query)
+            ranked = sorted((i for i in fuzzy if i not in seen and self.entries[i]['kind'] in kinds),
+                            key=lambda i: (-fuzzy[i], i))
+            results += ranked[:limit - len(results)]
+        return [self.entries[i] for i in results]
@@ -1,8 +1,16 @@
+import json
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.io as pio
 import requests
+import aggregates
+import partitions
+import rollups
+import search_index
+import warmup
+import wrapped
 pio.json.config.default_engine = "json"
 
 # Custom theme configuration
@@ -156,13 +164,70 @@ def load_data():
     df = pd.read_csv("df_clean.csv", parse_dates=["ts_local_clean"])
     return df
 
-df = load_data()
+# Background warm-up, started once per server process by the first session
+# (Streamlit has no startup hook; run `python warmup.py` to pre-warm before
+# anyone visits). It prepares the store, rollups, search index and
+# default-view aggregates, and persists them so a restarted server starts
+# hot. The loaders below wait for its results instead of repeating the work.
+@st.cache_resource
+def start_warmup():
+    return warmup.WarmupWorker("df_clean.csv").start()
+
+warm_worker = start_warmup()
+
+# Warm-up progress, drawn before anything waits on the worker. While the
+# script waits on a step, wait_for_warmup() keeps the slot updated; once the
+# page is drawn a fragment at the end of the script takes over.
+warm_status = st.sidebar.container()
+warm_status_slot = warm_status.empty()
+
+def show_warmup_progress(slot):
+    progress = warm_worker.progress
+    if not progress['finished']:
+        slot.progress(progress['done'] / progress['total'],
+                      text=f"Warming caches: {progress['step']}")
+    elif progress['error']:
+        slot.caption(f"Cache warm-up failed ({progress['error']}); views are computed live.")
+    else:
+        slot.empty()
 
-# Preprocessing
-df['hours'] = df['ms_played'] / (1000 * 60 * 60)
-df['minutes'] = df['ms_played'] / (1000 * 60)
-df['date'] = pd.to_datetime(df['ts_local_clean']).dt.date
-df['Year'] = pd.to_datetime(df['ts_local_clean']).dt.year
+def wait_for_warmup(step):
+    # Poll rather than block so the progress bar keeps moving
+    while not warm_worker.wait(step, timeout=0.25):
+        show_warmup_progress(warm_status_slot)
+    show_warmup_progress(warm_status_slot)
+
+# Year/month partitioned copy of the data; filters only read the partitions
+# their manifest statistics say can match.
+@st.cache_data
+def load_store_manifest():
+    warm_worker.wait('store')
+    return warm_worker.manifest or partitions.ensure_store("df_clean.csv")
+
+@st.cache_data
+def load_partition(rel_path, content_hash):
+    # content_hash only keys the cache so a changed partition is re-read
+    return partitions.read_partition(rel_path)
+
+wait_for_warmup('store')
+manifest = load_store_manifest()
+
+# Persisted rollups for the full history; only partitions that changed since
+# the last refresh are read.
+@st.cache_data
+def load_rollups():
+    warm_worker.wait('rollups')
+    return warm_worker.rollups or rollups.refresh(
+        load_store_manifest(), reader=lambda stats: load_partition(stats['path'], stats['hash']))
+
+# Artist/track/album typeahead index, built once per server process
+@st.cache_resource
+def load_search_index():
+    warm_worker.wait('search')
+    return warm_worker.search or search_index.SearchIndex.from_dataframe(load_data())
+
+wait_for_warmup('search')
+search = load_search_index()
 
 # Enhanced Sidebar
 with st.sidebar:
@@ -171,11 +236,39 @@ with st.sidebar:
     # Time Range Selection with checkboxes
     st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
     st.markdown('<div class="sidebar-section-title">📅 Time Range</div>', unsafe_allow_html=True)
-    all_years = sorted(df['Year'].dropna().unique())
+    all_years = partitions.partition_values(manifest, 'year')
     year_checks = {}
     for year in all_years:
         year_checks[year] = st.checkbox(str(year), value=True, key=f"year_{year}")
     selected_years = [year for year, checked in year_checks.items() if checked]
+    first_day = pd.Timestamp(manifest['partitions'][0]['ts_min']).date()
+    last_day = pd.Timestamp(manifest['partitions'][-1]['ts_max']).date()
+    date_range = st.date_input(
+        "Date Range",
+        value=(first_day, last_day),
+        min_value=first_day,
+        max_value=last_day,
+        help="Only plays between these dates (inclusive) are shown"
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Playback filters
+    st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
+    st.markdown('<div class="sidebar-section-title">🎛️ Playback Filters</div>', unsafe_allow_html=True)
+    selected_platforms = st.multiselect(
+        "Platforms",
+        options=partitions.partition_values(manifest, 'platforms'),
+        help="Leave empty to include all platforms"
+    )
+    selected_countries = st.multiselect(
+        "Countries",
+        options=partitions.partition_values(manifest, 'countries'),
+        help="Leave empty to include all countries"
+    )
+    flag_options = {"All": None, "Yes": True, "No": False}
+    shuffle_filter = st.selectbox("Shuffle", options=list(flag_options), index=0)
+    offline_filter = st.selectbox("Offline", options=list(flag_options), index=0)
+    incognito_filter = st.selectbox("Incognito", options=list(flag_options), index=0)
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Track Analysis with number input
@@ -194,13 +287,31 @@ with st.sidebar:
     # Artist Analysis with autocomplete
     st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
     st.markdown('<div class="sidebar-section-title">🎤 Artist Analysis</div>', unsafe_allow_html=True)
-    artist_list = sorted(df['master_metadata_album_artist_name'].dropna().unique())
-    artist_filter = st.selectbox(
-        "Select or Search Artist",
-        options=["(All Artists)"] + artist_list,
-        index=0,
-        help="Start typing to search for an artist"
+    artist_query = st.text_input(
+        "Search Artist, Track or Album",
+        value="",
+        help="Results are ranked by listening hours and tolerate typos"
     )
+    # Only a bounded page of matches is sent to the widget; picking a track
+    # or album analyses its artist.
+    kinds = search_index.KINDS if artist_query else ('artist',)
+    matches = search.search(artist_query, kinds=kinds, limit=50)
+    match_labels = {}
+    for match in matches:
+        if match['kind'] == 'artist':
+            label = f"🎤 {match['name']}"
+        elif match['kind'] == 'track':
+            label = f"🎵 {match['name']} — {match['artist']}"
+        else:
+            label = f"💿 {match['name']} — {match['artist']}"
+        match_labels[label] = match['artist']
+    artist_choice = st.selectbox(
+        "Select Artist",
+        options=["(All Artists)"] + list(match_labels),
+        index=1 if artist_query and match_labels else 0,
+        help="Start typing above to search for an artist"
+    )
+    artist_filter = match_labels.get(artist_choice, "(All Artists)")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # About Section
@@ -212,16 +323,57 @@ with st.sidebar:
     """)
     st.markdown('</div>', unsafe_allow_html=True)
 
-# Filter by selected years
-if selected_years:
-    df = df[df['Year'].isin(selected_years)]
+# Read only the partitions that can match the selected filters
+filters = partitions.empty_filters()
+if selected_years and set(selected_years) != set(all_years):
+    filters['years'] = selected_years
+# date_input returns a single date while a range is still being picked
+if len(date_range) == 2 and tuple(date_range) != (first_day, last_day):
+    filters['start'], filters['end'] = date_range
+filters['platforms'] = selected_platforms or None
+filters['countries'] = selected_countries or None
+filters['shuffle'] = flag_options[shuffle_filter]
+filters['offline'] = flag_options[offline_filter]
+filters['incognito'] = flag_options[incognito_filter]
+
+df = partitions.read(
+    filters,
+    manifest,
+    reader=lambda p: load_partition(p['path'], p['hash'])
+)
+if df.empty:
+    st.warning("No plays match the selected filters.")
+    st.stop()
+
+# Preprocessing
+df['hours'] = df['ms_played'] / (1000 * 60 * 60)
+df['minutes'] = df['ms_played'] / (1000 * 60)
+df['date'] = pd.to_datetime(df['ts_local_clean']).dt.date
+df['Year'] = pd.to_datetime(df['ts_local_clean']).dt.year
+
+wait_for_warmup('rollups')
+rollup_tables, rollup_state = load_rollups()
+
+# The persisted rollups cover the full history, so they can only stand in for
+# the live aggregates when nothing is filtered out.
+use_rollups = filters == partitions.empty_filters() and rollup_state['rows'] > 0
+
+# The default view (nothing filtered, default top_n) comes from the warm-up
+# worker; anything else is aggregated live.
+default_view = filters == partitions.empty_filters() and top_n == warmup.DEFAULT_TOP_N
+if default_view:
+    wait_for_warmup('overview')
+if default_view and warm_worker.state is not None:
+    view = warm_worker.state['overview']
+else:
+    view = aggregates.overview(df, top_n)
 
 # Metrics
-total_hours = df['hours'].sum()
-total_tracks = len(df[df['ms_played'] > 0])
+total_hours = view['total_hours']
+total_tracks = view['total_tracks']
 
 # Total number of unique listening days
-unique_days = df['date'].nunique()
+unique_days = view['unique_days']
 
 # Average listening hours per day
 avg_hours_per_day = total_hours / unique_days if unique_days > 0 else 0
@@ -246,17 +398,8 @@ st.markdown("---")
 
 # Top N Tracks
 st.subheader(f"🎵 Top {top_n} Tracks")
-if 'track_id' in df.columns:
-    top_tracks = (df[df['ms_played'] > 0]
-                  .groupby(['master_metadata_track_name', 'track_id'])['hours']
-                  .sum()
-                  .sort_values(ascending=False)
-                  .head(top_n)
-                  .reset_index())
-    top_tracks.columns = ['Track', 'Track ID', 'Hours']
-    top_tracks['Listening Time'] = top_tracks['Hours'].apply(
-        lambda h: f"{int(h)} hrs {int(round((h - int(h)) * 60))} mins"
-    )
+top_tracks = view['top_tracks']
+if 'Track ID' in top_tracks.columns:
     for _, row in top_tracks.iterrows():
         st.markdown(f"""
         <div style='display: flex; align-items: center; background: #181818; border-radius: 16px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px #0003;'>
@@ -270,16 +413,6 @@ if 'track_id' in df.columns:
         </div>
         """, unsafe_allow_html=True)
 else:
-    top_tracks = (df[df['ms_played'] > 0]
-                  .groupby('master_metadata_track_name')['hours']
-                  .sum()
-                  .sort_values(ascending=False)
-                  .head(top_n)
-                  .reset_index())
-    top_tracks.columns = ['Track', 'Hours']
-    top_tracks['Listening Time'] = top_tracks['Hours'].apply(
-        lambda h: f"{int(h)} hrs {int(round((h - int(h)) * 60))} mins"
-    )
     for _, row in top_tracks.iterrows():
         st.markdown(f"""
         <div style='display: flex; align-items: center; background: #181818; border-radius: 16px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px #0003;'>
@@ -292,9 +425,7 @@ else:
 
 # Platform Comparison
 st.subheader("🖥️ Platform Usage Comparison")
-platform_usage = df.groupby('platform_clean')['hours'].sum().sort_values(ascending=False).reset_index()
-platform_usage.columns = ['Platform', 'Hours']
-platform_usage['Hours'] = platform_usage['Hours'].round(2)
+platform_usage = view['platform_usage']
 fig_platform = px.bar(platform_usage, x='Platform', y='Hours', 
                       title="Hours Played by Platform",
                       color_discrete_sequence=['#1db954'],
@@ -312,8 +443,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("🔀 Shuffle Usage")
-    shuffle_counts = df['shuffle'].value_counts().rename(index={True: "Shuffled", False: "Not Shuffled"}).reset_index()
-    shuffle_counts.columns = ['Shuffle', 'Count']
+    shuffle_counts = view['shuffle_counts']
     fig_shuffle = px.pie(shuffle_counts, names='Shuffle', values='Count', 
                         title="Shuffle vs Non-Shuffle",
                         color_discrete_sequence=['#1db954', '#212121'],
@@ -327,8 +457,7 @@ with col1:
 
 with col2:
     st.subheader("📶 Offline vs Online Playback")
-    offline_counts = df['offline'].value_counts().rename(index={True: "Offline", False: "Online"}).reset_index()
-    offline_counts.columns = ['Mode', 'Count']
+    offline_counts = view['offline_counts']
     fig_offline = px.pie(offline_counts, names='Mode', values='Count', 
                         title="Offline vs Online",
                         color_discrete_sequence=['#1db954', '#121212'],
@@ -342,8 +471,11 @@ with col2:
 
 # Map of Countries Played
 st.subheader("🌍 Country-wise Listening")
-country_counts = df.groupby('conn_country_full')['hours'].sum().round(2).reset_index()
-country_counts.columns = ['Country', 'Hours']
+if use_rollups:
+    country_counts = rollup_tables['country'].dropna(subset=['conn_country_full'])[['conn_country_full', 'hours']].round(2)
+    country_counts.columns = ['Country', 'Hours']
+else:
+    country_counts = view['country_counts']
 fig_map = px.choropleth(country_counts, 
                        locations="Country", 
                        locationmode="country names",
@@ -361,7 +493,10 @@ st.plotly_chart(fig_map, use_container_width=True)
 
 # Line chart of playtime
 st.subheader("📈 Listening Time Over Time")
-time_series = df.groupby('date')['hours'].sum().round(2).reset_index()
+if use_rollups:
+    time_series = rollup_tables['daily'][['date', 'hours']].round(2)
+else:
+    time_series = view['time_series']
 fig_time = px.line(time_series, x='date', y='hours', 
                   title="Daily Listening Time (Hours)",
                   color_discrete_sequence=['#1db954'],
@@ -383,94 +518,68 @@ fig_time.update_layout(
 st.plotly_chart(fig_time, use_container_width=True)
 
 # --- Feature 1: Listening Streaks ---
-df_sorted = df.sort_values('date')
-activity_days = pd.Series(df_sorted['date'].unique())
-activity_days = pd.to_datetime(activity_days)
-streaks = (activity_days.diff() != pd.Timedelta(days=1)).cumsum()
-streak_lengths = activity_days.groupby(streaks).agg(['count', 'min', 'max'])
-longest_streak = streak_lengths['count'].max()
-longest_streak_row = streak_lengths[streak_lengths['count'] == longest_streak].iloc[0]
-longest_streak_start = longest_streak_row['min'].date()
-longest_streak_end = longest_streak_row['max'].date()
+if use_rollups:
+    longest_streak = rollup_state['longest_streak']['count']
+    longest_streak_start = rollup_state['longest_streak']['start']
+    longest_streak_end = rollup_state['longest_streak']['end']
+    daily_rollup = rollup_tables['daily']
+    max_day_row = daily_rollup.loc[daily_rollup['hours'].idxmax()]
+else:
+    df_sorted = df.sort_values('date')
+    activity_days = pd.Series(df_sorted['date'].unique())
+    activity_days = pd.to_datetime(activity_days)
+    streaks = (activity_days.diff() != pd.Timedelta(days=1)).cumsum()
+    streak_lengths = activity_days.groupby(streaks).agg(['count', 'min', 'max'])
+    longest_streak = streak_lengths['count'].max()
+    longest_streak_row = streak_lengths[streak_lengths['count'] == longest_streak].iloc[0]
+    longest_streak_start = longest_streak_row['min'].date()
+    longest_streak_end = longest_streak_row['max'].date()
+    max_day_row = df.groupby('date')['hours'].sum().sort_values(ascending=False).reset_index().iloc[0]
 
 # Day with highest listening
-max_day_row = df.groupby('date')['hours'].sum().sort_values(ascending=False).reset_index().iloc[0]
 max_day = max_day_row['date']
 max_day_hours = max_day_row['hours']
 
 # --- Feature 4: Listening Milestones ---
-first_row = df.sort_values('ts_local_clean').iloc[0]
-first_song = first_row['master_metadata_track_name']
-first_artist = first_row['master_metadata_album_artist_name']
-first_date = first_row['date']
-
-# Cumulative hours for milestones
-cumulative = df.groupby('date')['hours'].sum().cumsum().reset_index()
-milestones = [100, 500, 1000, 2000, 5000, 10000, 20000]
-milestone_dates = {}
-for m in milestones:
-    milestone_row = cumulative[cumulative['hours'] >= m].head(1)
-    if not milestone_row.empty:
-        milestone_dates[m] = milestone_row.iloc[0]['date']
+milestones = rollups.MILESTONES
+if use_rollups:
+    first_song = rollup_state['first_play']['track']
+    first_artist = rollup_state['first_play']['artist']
+    first_date = rollup_state['first_play']['date']
+    milestone_dates = {int(m): d for m, d in rollup_state['milestones'].items()}
+    track_hours = rollup_tables['track'].groupby('master_metadata_track_name')['hours'].sum().sort_values(ascending=False)
+else:
+    first_row = df.sort_values('ts_local_clean').iloc[0]
+    first_song = first_row['master_metadata_track_name']
+    first_artist = first_row['master_metadata_album_artist_name']
+    first_date = first_row['date']
+
+    # Cumulative hours for milestones
+    cumulative = df.groupby('date')['hours'].sum().cumsum().reset_index()
+    milestone_dates = {}
+    for m in milestones:
+        milestone_row = cumulative[cumulative['hours'] >= m].head(1)
+        if not milestone_row.empty:
+            milestone_dates[m] = milestone_row.iloc[0]['date']
+    track_hours = df.groupby('master_metadata_track_name')['hours'].sum().sort_values(ascending=False)
 
 # Most listened track and date
-track_hours = df.groupby('master_metadata_track_name')['hours'].sum().sort_values(ascending=False)
 most_listened_track = track_hours.index[0]
 most_listened_hours = track_hours.iloc[0]
 most_listened_date = df[df['master_metadata_track_name'] == most_listened_track].groupby('date')['hours'].sum().idxmax()
 
 # --- Feature 5: Listening by Time of Day ---
-df['hour'] = pd.to_datetime(df['ts_local_clean']).dt.hour
-def time_bucket(h):
-    if 5 <= h <= 11:
-        return 'Morning (5-11)'
-    elif 12 <= h <= 17:
-        return 'Afternoon (12-17)'
-    elif 18 <= h <= 22:
-        return 'Evening (18-22)'
-    else:
-        return 'Night (23-4)'
-df['time_bucket'] = df['hour'].apply(time_bucket)
-time_of_day = df.groupby('time_bucket')['hours'].sum().reindex([
-    'Morning (5-11)', 'Afternoon (12-17)', 'Evening (18-22)', 'Night (23-4)']).reset_index()
+time_of_day = view['time_of_day']
 
 # --- Feature 7: Skips and Replays Insight ---
-total_skipped = df['skipped'].sum() if 'skipped' in df.columns else 0
-top_skipped = (df[df['skipped'] == True]
-               .groupby('master_metadata_track_name')
-               .size()
-               .sort_values(ascending=False)
-               .head(5)
-               .reset_index(name='Skips')) if 'skipped' in df.columns else pd.DataFrame()
-top_played = (df[df['skipped'] == False]
-              .groupby('master_metadata_track_name')['hours']
-              .sum()
-              .sort_values(ascending=False)
-              .head(5)
-              .reset_index()) if 'skipped' in df.columns else pd.DataFrame()
+total_skipped = view['total_skipped']
+top_skipped = view['top_skipped']
+top_played = view['top_played']
 
 # --- Custom Feature: Monthly and Weekday Trends ---
-df['month'] = pd.to_datetime(df['ts_local_clean']).dt.strftime('%b')
-df['month_num'] = pd.to_datetime(df['ts_local_clean']).dt.month
-df['weekday'] = pd.to_datetime(df['ts_local_clean']).dt.day_name()
-monthly_hours = df.groupby(['month_num', 'month'])['hours'].sum().reset_index().sort_values('month_num')
-
-# FIX: Average daily listening hours by weekday (use daily totals)
-daily_totals = df.groupby('date')['hours'].sum().reset_index()
-daily_totals['weekday'] = pd.to_datetime(daily_totals['date']).dt.day_name()
-weekday_hours = daily_totals.groupby('weekday')['hours'].mean().reindex([
-    'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']).reset_index()
-
-# heatmap_data = df.groupby(['month', 'weekday'])['hours'].sum().unstack(fill_value=0)
-month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-# Apply Categorical type to preserve order
-df['month'] = pd.Categorical(df['month'], categories=month_order, ordered=True)
-df['weekday'] = pd.Categorical(df['weekday'], categories=weekday_order, ordered=True)
-
-heatmap_data = df.groupby(['month', 'weekday'])['hours'].sum().unstack(fill_value=0).loc[month_order]
+monthly_hours = view['monthly_hours']
+weekday_hours = view['weekday_hours']
+heatmap_data = view['heatmap_data']
 
 
 # --- UI Section: Listening Streaks and Milestones ---
@@ -535,10 +644,55 @@ fig_heatmap = px.imshow(heatmap_data,
 fig_heatmap.update_layout(plot_bgcolor='#282828', paper_bgcolor='#282828', font=dict(color='white'))
 st.plotly_chart(fig_heatmap, use_container_width=True)
 
-# --- Feature 14: Export Summary to PDF/PNG (Placeholder) ---
-# st.markdown("## 📤 Export Your Spotify Summary")
-# st.info("Export to PDF/PNG coming soon! (Will include total hours, top tracks, top artist, and streaks)")
-# (Implementation would use pdfkit/imgkit/html2image and st.download_button)
+# --- Feature 14: Export Wrapped Summary ---
+# Served from the snapshots the warm-up worker keeps up to date (or
+# `python wrapped.py`). Until the worker has checked them, or for a year
+# without a snapshot, the year is summarised on the fly instead of waiting.
+@st.cache_data
+def load_wrapped(year, snapshots_ready):
+    snapshot = wrapped.load_snapshot(year) if snapshots_ready else None
+    if snapshot is None:
+        year_filters = partitions.empty_filters()
+        year_filters['years'] = [year]
+        year_df = partitions.read(
+            year_filters,
+            load_store_manifest(),
+            reader=lambda p: load_partition(p['path'], p['hash'])
+        )
+        snapshot = wrapped.build_snapshot(year_df, year)
+    return snapshot, wrapped.render_html(snapshot)
+
+st.markdown("## 📤 Export Your Spotify Summary")
+wrapped_year = st.selectbox("Wrapped Year", options=list(reversed(all_years)), index=0)
+wrapped_snapshot, wrapped_html = load_wrapped(int(wrapped_year), warm_worker.events['wrapped'].is_set())
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button(
+        "Download Wrapped (HTML)",
+        data=wrapped_html,
+        file_name=f"spotify_wrapped_{wrapped_year}.html",
+        mime="text/html"
+    )
+with col2:
+    st.download_button(
+        "Download Wrapped (JSON)",
+        data=json.dumps(wrapped_snapshot, indent=2, ensure_ascii=False),
+        file_name=f"spotify_wrapped_{wrapped_year}.json",
+        mime="application/json"
+    )
+# The PNG is only rendered by the batch job; offer it only when it was built
+# from the same plays as the summary above (not when that was built live).
+wrapped_png = wrapped.snapshot_path(int(wrapped_year), "png")
+saved_snapshot = wrapped.load_snapshot(int(wrapped_year))
+if (os.path.exists(wrapped_png) and saved_snapshot is not None
+        and saved_snapshot.get('source') == wrapped_snapshot['source']):
+    with open(wrapped_png, 'rb') as f:
+        st.download_button(
+            "Download Wrapped (PNG)",
+            data=f.read(),
+            file_name=f"spotify_wrapped_{wrapped_year}.png",
+            mime="image/png"
+        )
 
 # Artist-specific Analytics
 st.subheader("🎤 Artist Analytics")
@@ -609,9 +763,16 @@ if artist_filter and artist_filter != "(All Artists)":
     """, unsafe_allow_html=True)
 
     # Artist Data
-    artist_df = df[df['master_metadata_album_artist_name'] == artist_filter]
-    artist_hours = artist_df['hours'].sum().round(2)
-    artist_tracks = len(artist_df['master_metadata_track_name'].unique())
+    # The most listened artists are precomputed by the warm-up worker
+    if default_view:
+        wait_for_warmup('artists')
+    if default_view and warm_worker.state is not None and artist_filter in warm_worker.state['artists']:
+        artist_view = warm_worker.state['artists'][artist_filter]
+    else:
+        artist_df = df[df['master_metadata_album_artist_name'] == artist_filter]
+        artist_view = aggregates.artist_overview(artist_df, top_n)
+    artist_hours = artist_view['hours']
+    artist_tracks = artist_view['tracks']
     artist_avg_hours = artist_hours / unique_days if unique_days > 0 else 0
 
     # HTML Block
@@ -641,16 +802,8 @@ if artist_filter and artist_filter != "(All Artists)":
     
     # Artist's top tracks
     st.subheader(f"🎤 Top {top_n} Tracks by {artist_filter}")
-    if 'track_id' in artist_df.columns:
-        top_artist_tracks = (artist_df.groupby(['master_metadata_track_name', 'track_id'])['hours']
-                             .sum()
-                             .sort_values(ascending=False)
-                             .head(top_n)
-                             .reset_index())
-        top_artist_tracks.columns = ['Track', 'Track ID', 'Hours']
-        top_artist_tracks['Listening Time'] = top_artist_tracks['Hours'].apply(
-            lambda h: f"{int(h)} hrs {int(round((h - int(h)) * 60))} mins"
-        )
+    top_artist_tracks = artist_view['top_tracks']
+    if 'Track ID' in top_artist_tracks.columns:
         for _, row in top_artist_tracks.iterrows():
             st.markdown(f"""
             <div style='display: flex; align-items: center; background: #181818; border-radius: 16px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px #0003;'>
@@ -664,15 +817,6 @@ if artist_filter and artist_filter != "(All Artists)":
             </div>
             """, unsafe_allow_html=True)
     else:
-        top_artist_tracks = (artist_df.groupby('master_metadata_track_name')['hours']
-                             .sum()
-                             .sort_values(ascending=False)
-                             .head(top_n)
-                             .reset_index())
-        top_artist_tracks.columns = ['Track', 'Hours']
-        top_artist_tracks['Listening Time'] = top_artist_tracks['Hours'].apply(
-            lambda h: f"{int(h)} hrs {int(round((h - int(h)) * 60))} mins"
-        )
         for _, row in top_artist_tracks.iterrows():
             st.markdown(f"""
             <div style='display: flex; align-items: center; background: #181818; border-radius: 16px; margin-bottom: 1.5rem; box-shadow: 0 2px 8px #0003;'>
@@ -683,28 +827,9 @@ if artist_filter and artist_filter != "(All Artists)":
             </div>
             """, unsafe_allow_html=True)
 
-    # Helper: Time bucket function
-    def time_bucket(h):
-        if 5 <= h <= 11:
-            return 'Morning (5-11)'
-        elif 12 <= h <= 17:
-            return 'Afternoon (12-17)'
-        elif 18 <= h <= 22:
-            return 'Evening (18-22)'
-        else:
-            return 'Night (23-4)'
-
-
     # Artist's listening time by time of day
     st.subheader(f"⏰ {artist_filter} Listening by Time of Day")
-
-    artist_df['hour'] = pd.to_datetime(artist_df['ts_local_clean']).dt.hour
-    artist_df['time_bucket'] = artist_df['hour'].apply(time_bucket)
-
-    artist_time_of_day = (artist_df.groupby('time_bucket')['hours']
-                        .sum()
-                        .reindex(['Morning (5-11)', 'Afternoon (12-17)', 'Evening (18-22)', 'Night (23-4)'])
-                        .reset_index())
+    artist_time_of_day = artist_view['time_of_day']
 
     fig_artist_timeofday = px.bar(artist_time_of_day, 
                                 x='time_bucket', 
@@ -722,7 +847,7 @@ if artist_filter and artist_filter != "(All Artists)":
 
     # Artist's listening time over time
     st.subheader(f"📈 {artist_filter} Listening Time Over Time")
-    artist_time_series = artist_df.groupby('date')['hours'].sum().round(2).reset_index()
+    artist_time_series = artist_view['time_series']
     fig_artist_time = px.line(artist_time_series, x='date', y='hours',
                              title=f"Daily {artist_filter} Listening Time (Hours)",
                              color_discrete_sequence=['#1db954'],
@@ -739,8 +864,7 @@ if artist_filter and artist_filter != "(All Artists)":
     
     # Artist's platform usage
     st.subheader(f"🖥️ {artist_filter} Platform Usage")
-    artist_platform = artist_df.groupby('platform_clean')['hours'].sum().round(2).reset_index()
-    artist_platform.columns = ['Platform', 'Hours']
+    artist_platform = artist_view['platform_usage']
     fig_artist_platform = px.bar(artist_platform, x='Platform', y='Hours',
                                 title=f"Hours of {artist_filter} Played by Platform",
                                 color_discrete_sequence=['#1db954'],
@@ -755,8 +879,7 @@ if artist_filter and artist_filter != "(All Artists)":
 
     # Artist's shuffle comparison
     st.subheader(f"🔀 {artist_filter} Shuffle Usage")
-    shuffle_counts = artist_df['shuffle'].value_counts().rename(index={True: "Shuffled", False: "Not Shuffled"}).reset_index()
-    shuffle_counts.columns = ['Shuffle', 'Count']
+    shuffle_counts = artist_view['shuffle_counts']
     fig_shuffle = px.pie(shuffle_counts, names='Shuffle', values='Count',
                         title=f"Shuffle vs Non-Shuffle for {artist_filter}",
                         color_discrete_sequence=['#1db954', '#212121'],
@@ -770,8 +893,7 @@ if artist_filter and artist_filter != "(All Artists)":
 
     # Artist's offline/online comparison
     st.subheader(f"📶 {artist_filter} Offline vs Online Playback")
-    offline_counts = artist_df['offline'].value_counts().rename(index={True: "Offline", False: "Online"}).reset_index()
-    offline_counts.columns = ['Mode', 'Count']
+    offline_counts = artist_view['offline_counts']
     fig_offline = px.pie(offline_counts, names='Mode', values='Count',
                         title=f"Offline vs Online for {artist_filter}",
                         color_discrete_sequence=['#1db954', '#121212'],
@@ -785,8 +907,7 @@ if artist_filter and artist_filter != "(All Artists)":
 
     # Artist's country-wise listening
     st.subheader(f"🌍 {artist_filter} Country-wise Listening")
-    artist_country_counts = artist_df.groupby('conn_country_full')['hours'].sum().round(2).reset_index()
-    artist_country_counts.columns = ['Country', 'Hours']
+    artist_country_counts = artist_view['country_counts']
     fig_artist_map = px.choropleth(artist_country_counts,
                                    locations="Country",
                                    locationmode="country names",
@@ -800,4 +921,18 @@ if artist_filter and artist_filter != "(All Artists)":
         font=dict(color='white'),
         geo=dict(bgcolor='#282828')
     )
-    st.plotly_chart(fig_artist_map, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(fig_artist_map, use_container_width=True)
+
+# Keep the warm-up progress moving after the page is drawn; once the worker
+# is done, rerun so the page picks up its results and the polling stops.
+if not warm_worker.progress['finished']:
+    warm_status_slot.empty()
+
+    @st.fragment(run_every=1)
+    def warmup_progress():
+        show_warmup_progress(st.empty())
+        if warm_worker.progress['finished']:
+            st.rerun()
+
+    with warm_status:
+        warmup_progress()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+
+import aggregates
+import partitions
+import rollups
+import search_index
+import wrapped
+
+# Background warm-up for dashboard startup.
+#
+# The dashboard starts one WarmupWorker per server process, when the first
+# session runs the script: Streamlit has no startup hook, so on a cold start
+# with no WARM_DIR that first visitor still waits on the steps the page needs.
+# Run this module before starting the server to avoid that.
+#
+# The worker prepares the partitioned store, refreshes the rollups, builds the
+# search index, the default-view aggregates (all data, top_n=DEFAULT_TOP_N),
+# the aggregates for the most listened artists and the Wrapped snapshots,
+# reporting progress as it goes. The results are pickled to WARM_DIR keyed by
+# a fingerprint of the partitions' content hashes and CACHE_VERSION, so a
+# restarted server loads them instead of recomputing anything while the data
+# is unchanged.
+#
+# Each step sets an event when done so the dashboard can wait for just the
+# piece it needs rather than doing the same work twice.
+#
+# Usage (pre-warm before starting the server):
+#   python warmup.py [df_clean.csv]
+
+WARM_DIR = "warm_cache"
+# Bump when aggregates.py or the shape of the warm state changes
+CACHE_VERSION = 1
+STATE_FILE = "warm_state.pkl"
+DEFAULT_TOP_N = 10
+POPULAR_ARTISTS = 20
+STEPS = ['store', 'history', 'rollups', 'search', 'overview', 'artists', 'wrapped', 'save']
+STEP_LABELS = {
+    'store': "Preparing partitioned store",
+    'history': "Loading listening history",
+    'rollups': "Refreshing rollups",
+    'search': "Building search index",
+    'overview': "Aggregating default view",
+    'artists': "Aggregating popular artists",
+    'wrapped': "Building Wrapped snapshots",
+    'save': "Saving warm cache",
+}
+
+
+def fingerprint(manifest):
+    parts = [(p['path'], p['rows'], p.get('hash')) for p in manifest['partitions']]
+    key = [CACHE_VERSION, rollups.ROLLUP_VERSION, DEFAULT_TOP_N, POPULAR_ARTISTS, parts]
+    return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+def load_warm_state(manifest, path=WARM_DIR):
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if state.get('fingerprint') != fingerprint(manifest):
+        return None
+    return state
+
+
+def save_warm_state(state, path=WARM_DIR):
+    os.makedirs(path, exist_ok=True)
+    state_path = os.path.join(path, STATE_FILE)
+    # Write then rename so a reader never sees a half-written file
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+class WarmupWorker:
+    def __init__(self, csv_path="df_clean.csv", path=WARM_DIR, log=False):
+        self.csv_path = csv_path
+        self.path = path
+        self.log = log
+        self.events = {step: threading.Event() for step in STEPS}
+        self.progress = {'step': None, 'done': 0, 'total': len(STEPS), 'finished': False,
+                         'from_disk': False, 'error': None}
+        # Results, filled in as the steps complete
+        self.manifest = None
+        self.rollups = None
+        self.search = None
+        self.state = None
+        self._current = STEPS[0]
+        self._thread = threading.Thread(target=self.run, name="dashboard-warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self, step, timeout=None):
+        return self.events[step].wait(timeout)
+
+    def _begin(self, step):
+        self._current = step
+        self.progress['step'] = STEP_LABELS[step]
+        if self.log:
+            print(f"[{self.progress['done'] + 1}/{len(STEPS)}] {STEP_LABELS[step]}...", flush=True)
+
+    def _finish(self, step):
+        self.progress['done'] += 1
+        self.events[step].set()
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as exc:
+            self.progress['error'] = f"{STEP_LABELS[self._current]}: {exc!r}"
+            if self.log:
+                print(f"Warm-up failed: {self.progress['error']}", flush=True)
+        finally:
+            # Never leave the dashboard waiting on a step that will not run
+            for event in self.events.values():
+                event.set()
+            self.progress['step'] = None
+            self.progress['finished'] = True
+
+    def _run(self):
+        self._begin('store')
+        self.manifest = partitions.ensure_store(self.csv_path)
+        self._finish('store')
+
+        cached = load_warm_state(self.manifest, self.path)
+        if cached is not None:
+            # Unchanged data: everything comes from the previous run
+            self.progress['from_disk'] = True
+            self.rollups = rollups.load_rollups()
+            self.search = cached['search']
+            self.state = cached
+            for step in STEPS[1:]:
+                self._finish(step)
+            return
+
+        self._begin('history')
+        df = partitions.read(partitions.empty_filters(), self.manifest)
+        df['hours'] = df['ms_played'] / (1000 * 60 * 60)
+        df['date'] = df['ts_local_clean'].dt.date
+        self._finish('history')
+
+        self._begin('rollups')
+        self.rollups = rollups.refresh(self.manifest)
+        self._finish('rollups')
+
+        self._begin('search')
+        self.search = search_index.SearchIndex.from_dataframe(df)
+        self._finish('search')
+
+        self._begin('overview')
+        self.state = {
+            'fingerprint': fingerprint(self.manifest),
+            'overview': aggregates.overview(df, DEFAULT_TOP_N),
+            'artists': {},
+            'search': self.search,
+        }
+        self._finish('overview')
+
+        self._begin('artists')
+        artist_col = 'master_metadata_album_artist_name'
+        popular = df.groupby(artist_col)['hours'].sum().nlargest(POPULAR_ARTISTS).index
+        self.state['artists'] = {
+            artist: aggregates.artist_overview(artist_df, DEFAULT_TOP_N)
+            for artist, artist_df in df[df[artist_col].isin(popular)].groupby(artist_col)
+        }
+        self._finish('artists')
+
+        self._begin('wrapped')
+        wrapped.build_all(df)
+        self._finish('wrapped')
+
+        self._begin('save')
+        save_warm_state(self.state, self.path)
+        self._finish('save')
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "df_clean.csv"
+    worker = WarmupWorker(csv_path, log=True)
+    worker.run()
+    if worker.progress['error']:
+        sys.exit(1)
+    print("Warm cache loaded from disk (data unchanged)" if worker.progress['from_disk'] else "Warm cache saved")
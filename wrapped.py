@@ -0,0 +1,239 @@
+import html
+import json
+import os
+import sys
+
+import pandas as pd
+
+import rollups
+from aggregates import TIME_BUCKETS, time_bucket
+
+# Precomputed "Wrapped" year-in-review snapshots.
+#
+# A batch job that summarises each year of listening (total hours, top tracks
+# and artists, streaks, milestones, time of day) into a small JSON file, and
+# renders it to a self-contained HTML page (and a PNG of the same summary
+# when plotly's static image export is available). Rendering needs no network
+# access.
+# Each snapshot records a content hash of the plays it was built from, and a
+# year is only rebuilt when that hash no longer matches the data (new plays,
+# a corrected re-export), so unchanged years are never recomputed.
+#
+# Usage:
+#   python wrapped.py [df_clean.csv] [--force]
+
+SNAPSHOT_DIR = "snapshots"
+TOP_N = 10
+
+
+def snapshot_path(year, ext="json", path=SNAPSHOT_DIR):
+    return os.path.join(path, f"wrapped_{year}.{ext}")
+
+
+def source_hash(year_df):
+    return format(rollups.content_hash(year_df), '016x')
+
+
+def build_snapshot(year_df, year):
+    # The rollup delta logic already computes totals, streaks and milestones
+    # for an arbitrary batch of plays; a year is just a batch on empty state.
+    tables, state = rollups.apply_delta({name: None for name in rollups.ROLLUP_KEYS},
+                                        rollups.empty_state(), year_df)
+
+    track_keys = [k for k in rollups.ROLLUP_KEYS['track'] if k in tables['track'].columns]
+    top_tracks = (tables['track'].dropna(subset=['master_metadata_track_name'])
+                  .sort_values('hours', ascending=False).head(TOP_N))
+    top_artists = (tables['artist'].dropna(subset=['master_metadata_album_artist_name'])
+                   .sort_values('hours', ascending=False).head(TOP_N))
+
+    hours = year_df['ms_played'] / (1000 * 60 * 60)
+    buckets = pd.to_datetime(year_df['ts_local_clean']).dt.hour.map(time_bucket)
+    time_of_day = hours.groupby(buckets).sum().reindex(TIME_BUCKETS, fill_value=0)
+
+    return {
+        'year': int(year),
+        'source': source_hash(year_df),
+        'total_hours': round(state['total_hours'], 2),
+        'total_tracks': int((year_df['ms_played'] > 0).sum()),
+        'unique_days': int(len(tables['daily'])),
+        'top_tracks': [
+            {
+                'track': row['master_metadata_track_name'],
+                'track_id': row['track_id'] if 'track_id' in track_keys and pd.notna(row['track_id']) else None,
+                'hours': round(row['hours'], 2),
+            }
+            for _, row in top_tracks.iterrows()
+        ],
+        'top_artists': [
+            {'artist': row['master_metadata_album_artist_name'], 'hours': round(row['hours'], 2)}
+            for _, row in top_artists.iterrows()
+        ],
+        'first_play': state['first_play'],
+        'longest_streak': state['longest_streak'],
+        'milestones': state['milestones'],
+        'time_of_day': {bucket: round(h, 2) for bucket, h in time_of_day.items()},
+    }
+
+
+def render_html(snapshot):
+    # Inline styles only, so the page renders offline and can be shared as-is.
+    e = html.escape
+    tracks = "".join(
+        f"<li>{e(str(t['track']))} <span>{t['hours']:.2f} hrs</span></li>" for t in snapshot['top_tracks']
+    )
+    artists = "".join(
+        f"<li>{e(str(a['artist']))} <span>{a['hours']:.2f} hrs</span></li>" for a in snapshot['top_artists']
+    )
+    milestones = "".join(
+        f"<li>Crossed {e(m)} hours on {e(d)}</li>" for m, d in snapshot['milestones'].items()
+    ) or "<li>No milestones this year</li>"
+    peak = max(snapshot['time_of_day'].values()) or 1
+    time_of_day = "".join(
+        f"<div class='bar-row'><span class='bar-label'>{e(bucket)}</span>"
+        f"<span class='bar' style='width: {h / peak * 100:.0f}%'></span>"
+        f"<span>{h:.2f} hrs</span></div>"
+        for bucket, h in snapshot['time_of_day'].items()
+    )
+    streak = snapshot['longest_streak'] or {'count': 0, 'start': '-', 'end': '-'}
+    first = snapshot['first_play'] or {'track': '-', 'artist': '-', 'date': '-'}
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Spotify Wrapped {snapshot['year']}</title>
+<style>
+    body {{ background-color: #121212; color: #FFFFFF; font-family: sans-serif; margin: 0; padding: 40px; }}
+    h1 {{ color: #1DB954; font-size: 2.5rem; font-weight: 800; }}
+    h2 {{ color: #1DB954; }}
+    .metric-row {{ display: flex; gap: 24px; flex-wrap: wrap; margin-bottom: 32px; }}
+    .metric-card {{ background: #282828; border-radius: 20px; padding: 20px; text-align: center; flex: 1; min-width: 180px; }}
+    .metric-card h3 {{ color: #1DB954; font-size: 2rem; margin: 0 0 8px 0; }}
+    .metric-card p {{ color: #B3B3B3; margin: 0; }}
+    .columns {{ display: flex; gap: 32px; flex-wrap: wrap; }}
+    .column {{ flex: 1; min-width: 280px; background: #181818; border-radius: 16px; padding: 16px 24px; }}
+    li {{ margin-bottom: 6px; }}
+    li span {{ color: #1DB954; }}
+    .bar-row {{ display: flex; align-items: center; gap: 12px; margin-bottom: 8px; }}
+    .bar-label {{ width: 160px; color: #B3B3B3; }}
+    .bar {{ display: inline-block; height: 16px; background: #1DB954; border-radius: 8px; }}
+</style>
+</head>
+<body>
+<h1>🎧 Your {snapshot['year']} Wrapped</h1>
+<div class="metric-row">
+    <div class="metric-card"><h3>{snapshot['total_hours']:.2f}</h3><p>Total Listening Hours</p></div>
+    <div class="metric-card"><h3>{snapshot['total_tracks']:,}</h3><p>Total Tracks Played</p></div>
+    <div class="metric-card"><h3>{streak['count']} days</h3><p>Longest Streak ({e(streak['start'])} → {e(streak['end'])})</p></div>
+</div>
+<div class="columns">
+    <div class="column"><h2>🎵 Top Tracks</h2><ol>{tracks}</ol></div>
+    <div class="column"><h2>🎤 Top Artists</h2><ol>{artists}</ol></div>
+</div>
+<h2>🎉 Milestones</h2>
+<ul>
+    <li>First song: {e(str(first['track']))} by {e(str(first['artist']))} ({e(first['date'])})</li>
+    {milestones}
+</ul>
+<h2>⏰ Listening by Time of Day</h2>
+{time_of_day}
+</body>
+</html>
+"""
+
+
+def summary_figure(snapshot):
+    # The HTML page's summary laid out as one figure for the PNG export.
+    # Emoji are left out because kaleido's fonts may not have them.
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    streak = snapshot['longest_streak'] or {'count': 0, 'start': '-', 'end': '-'}
+    first = snapshot['first_play'] or {'track': '-', 'artist': '-', 'date': '-'}
+    milestones = [f"First song: {first['track']} by {first['artist']} ({first['date']})"]
+    milestones += [f"Crossed {m} hours on {d}" for m, d in snapshot['milestones'].items()]
+
+    fig = make_subplots(rows=2, cols=2, vertical_spacing=0.1, horizontal_spacing=0.06,
+                        specs=[[{'type': 'table'}, {'type': 'table'}], [{'type': 'xy'}, {'type': 'table'}]],
+                        subplot_titles=("Top Tracks", "Top Artists", "Listening by Time of Day", "Milestones"))
+    header = dict(fill_color='#1DB954', font=dict(color='#121212', size=14), align='left')
+    cells = dict(fill_color='#282828', font=dict(color='white', size=13), align='left', height=26)
+    for col, key, label in [(1, 'top_tracks', 'track'), (2, 'top_artists', 'artist')]:
+        rows = snapshot[key]
+        fig.add_trace(go.Table(
+            columnwidth=[1, 8, 2],
+            header=dict(values=['#', label.title(), 'Hours'], **header),
+            cells=dict(values=[list(range(1, len(rows) + 1)),
+                               [str(r[label]) for r in rows],
+                               [f"{r['hours']:.2f}" for r in rows]], **cells),
+        ), row=1, col=col)
+    fig.add_trace(go.Bar(x=list(snapshot['time_of_day']), y=list(snapshot['time_of_day'].values()),
+                         marker_color='#1db954'), row=2, col=1)
+    fig.add_trace(go.Table(header=dict(values=['Milestone'], **header),
+                           cells=dict(values=[milestones], **cells)), row=2, col=2)
+
+    fig.update_layout(
+        title=dict(text=f"Your {snapshot['year']} Wrapped<br><sup>"
+                        f"{snapshot['total_hours']:.2f} listening hours · {snapshot['total_tracks']:,} tracks played · "
+                        f"Longest streak {streak['count']} days ({streak['start']} → {streak['end']})</sup>",
+                   font=dict(color='#1DB954', size=32)),
+        width=1200, height=1000, showlegend=False,
+        plot_bgcolor='#282828', paper_bgcolor='#121212', font=dict(color='white'),
+        margin=dict(t=140),
+    )
+    fig.update_yaxes(title_text='hours', gridcolor='#404040', row=2, col=1)
+    return fig
+
+
+def render_png(snapshot, png_path):
+    # Static image export needs kaleido; skip the PNG quietly without it.
+    fig = summary_figure(snapshot)
+    try:
+        fig.write_image(png_path)
+    except (ImportError, ValueError, RuntimeError):
+        return False
+    return True
+
+
+def load_snapshot(year, path=SNAPSHOT_DIR):
+    json_path = snapshot_path(year, "json", path)
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_DIR, png=True):
+    os.makedirs(path, exist_ok=True)
+    year = snapshot['year']
+    # A PNG on disk always belongs to the JSON next to it: drop the old one
+    # first so a failed (or skipped) render never leaves it behind.
+    png_path = snapshot_path(year, "png", path)
+    if os.path.exists(png_path):
+        os.remove(png_path)
+    with open(snapshot_path(year, "json", path), 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    with open(snapshot_path(year, "html", path), 'w', encoding='utf-8') as f:
+        f.write(render_html(snapshot))
+    if png:
+        render_png(snapshot, png_path)
+
+
+def build_all(df, path=SNAPSHOT_DIR, force=False, png=True):
+    years = pd.to_datetime(df['ts_local_clean']).dt.year
+    built = []
+    for year, year_df in df.groupby(years):
+        existing = load_snapshot(year, path)
+        if not force and existing is not None and existing.get('source') == source_hash(year_df):
+            continue
+        write_snapshot(build_snapshot(year_df, year), path, png=png)
+        built.append(int(year))
+    return built
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    csv_path = args[0] if args else "df_clean.csv"
+    df = pd.read_csv(csv_path, parse_dates=["ts_local_clean"])
+    built = build_all(df, force="--force" in sys.argv)
+    print(f"Built snapshots for: {', '.join(map(str, built)) or 'nothing (all up to date)'}")